@@ -3,6 +3,18 @@ import sys
 import time
 import math
 import json
+import zlib
+import queue
+import struct
+import asyncio
+import argparse
+import ipaddress
+import itertools
+import threading
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pygame
 import pygame_gui
 import numpy as np
@@ -24,6 +36,7 @@ TEXT_MUTED = (170, 180, 190)
 SLIDER_BG = (50, 50, 60)
 
 G_CONST = 6.67430e-11
+DT_BASE = 60*60
 
 HOME = os.path.expanduser("~")
 DOCUMENTS = os.path.join(HOME, "Documents") if os.path.isdir(os.path.join(HOME, "Documents")) else HOME
@@ -32,6 +45,9 @@ THUMB_DIR = os.path.join(APP_SAVE_DIR, "thumbnails")
 os.makedirs(THUMB_DIR, exist_ok=True)
 
 SAVE_EXT = ".json"
+R_SUN_KM = R_sun.to(u.km).value
+
+_body_ids = itertools.count(1)
 
 # -----------------------------
 # Cisim sınıfları
@@ -52,15 +68,22 @@ class Star:
         self.velocity = np.array(velocity, dtype=float)
         self.acceleration = np.zeros(2, dtype=float)
         self.trail_world = []
+        self.mass_kg = float(self.mass.value)      # kare başı yollar ve kayıt için astropy'siz kopyalar
+        self.radius_m = float(self.radius.value)
+        self.true_px = body_true_px(self)
+        self.base_px = max(MIN_RADIUS_PIXELS, int(self.true_px))
+        self.uid = next(_body_ids)
 
     def draw(self, surf, camera, zoom):
         sx, sy = world_to_screen(self.position, camera, zoom)
-        base_px = max(MIN_RADIUS_PIXELS, int((self.radius.to(u.km).value) * VISUAL_SCALE_BASE / 10.0))
-        r_px = max(MIN_RADIUS_PIXELS, int(base_px * zoom))
+        r_px = max(MIN_RADIUS_PIXELS, int(self.base_px * zoom))
         if len(self.trail_world) > 1:
             pts = [world_to_screen((wx,wy), camera, zoom) for wx,wy in self.trail_world]
             pygame.draw.lines(surf, self.color, False, pts, max(1, int(1*zoom)))
         pygame.draw.circle(surf, self.color, (sx, sy), r_px)
+        self.record_trail()
+
+    def record_trail(self):
         self.trail_world.append((float(self.position[0]), float(self.position[1])))
         if len(self.trail_world) > 300:
             self.trail_world.pop(0)
@@ -86,15 +109,22 @@ class Planet:
         self.velocity = np.array(velocity, dtype=float)
         self.acceleration = np.zeros(2, dtype=float)
         self.trail_world = []
+        self.mass_kg = float(self.mass.value)      # kare başı yollar ve kayıt için astropy'siz kopyalar
+        self.radius_m = float(self.radius.value)
+        self.true_px = body_true_px(self)
+        self.base_px = max(MIN_RADIUS_PIXELS, int(self.true_px))
+        self.uid = next(_body_ids)
 
     def draw(self, surf, camera, zoom):
         sx, sy = world_to_screen(self.position, camera, zoom)
-        base_px = max(MIN_RADIUS_PIXELS, int((self.radius.to(u.km).value) * VISUAL_SCALE_BASE / 10.0))
-        r_px = max(MIN_RADIUS_PIXELS, int(base_px * zoom))
+        r_px = max(MIN_RADIUS_PIXELS, int(self.base_px * zoom))
         if len(self.trail_world) > 1:
             pts = [world_to_screen((wx,wy), camera, zoom) for wx,wy in self.trail_world]
             pygame.draw.lines(surf, self.color, False, pts, max(1, int(1*zoom)))
         pygame.draw.circle(surf, self.color, (sx, sy), r_px)
+        self.record_trail()
+
+    def record_trail(self):
         self.trail_world.append((float(self.position[0]), float(self.position[1])))
         if len(self.trail_world) > 600:
             self.trail_world.pop(0)
@@ -131,6 +161,39 @@ def screen_to_world(screen_pos, camera, zoom):
     wy = (sy - camera[1]) / (VISUAL_SCALE_BASE * zoom)
     return (wx, wy)
 
+def step_physics(objects, dt, solver=None):
+    # solver verilirse (ör. pm_accelerations) kuvvetler dizilerden hesaplanır
+    if solver is not None and objects:
+        pos = np.array([o.position for o in objects], dtype=float)
+        mass = np.fromiter((o.mass_kg for o in objects), dtype=float, count=len(objects))
+        acc = solver(pos, mass)
+        for o, a in zip(objects, acc):
+            o.acceleration[:] = a
+            o.move(dt)
+        return
+    n = len(objects)
+    for o in objects:
+        o.acceleration[:] = 0.0
+    for i in range(n):
+        for j in range(i+1, n):
+            a = objects[i]; b = objects[j]
+            r_vec = b.position - a.position
+            dist = np.linalg.norm(r_vec)
+            if dist == 0: continue
+            f = G_CONST * a.mass_kg * b.mass_kg / (dist*dist)
+            dir_uv = r_vec / dist
+            a.acceleration += (f / a.mass_kg) * dir_uv
+            b.acceleration -= (f / b.mass_kg) * dir_uv
+    for o in objects:
+        o.move(dt)
+
+def body_true_px(o):
+    # zoom=1'deki kırpılmamış ekran yarıçapı (genelde 1 pikselin çok altında)
+    try:
+        return (o.radius.to(u.km).value) * VISUAL_SCALE_BASE / 10.0
+    except Exception:
+        return 0.0
+
 def parse_color(text):
     try:
         if isinstance(text, (list,tuple)):
@@ -144,6 +207,459 @@ def parse_color(text):
     except Exception:
         return PRIMARY
 
+# -----------------------------
+# Parçacık-ağ (PM) kütleçekim çözücüsü
+# -----------------------------
+# Kütle bulut-içinde-hücre (CIC) ile ızgaraya dağıtılır, potansiyel FFT ile
+# Green fonksiyonu konvolüsyonundan bulunur ve ivme aynı ağırlıklarla
+# parçacıklara geri okunur. Cisimler düzlemde ama çekim 1/r^2 olduğundan
+# çekirdek 2B Poisson'un log(r)'si değil -G/r'dir. Sıfır dolgulu 2N ızgara
+# izole sınır verir (Hockney-Eastwood); dolgusuz ızgara periyodiktir.
+PM_GRID = 256
+PM_MIN_GRID = 8           # kenar boşluğu 2+2 hücre; daha küçük ızgarada cisimlere yer kalmaz
+PM_MARGIN = 0.05          # kutu kenarında boşluk (kutu boyunun oranı)
+PM_MIN_CELL = 1e9         # m; yaklaşık bir Güneş çapı, daha ince ızgara noktasal cisimde anlamsız
+PM_BOX_PERCENTILE = 1.0   # ızgara kütlenin çoğuna oturur: %1..%99 kutusu ...
+PM_BOX_EXPAND = 2.0       # ... yarı genişliği bu kadar büyütülür; dışında kalanlar ızgaraya girmez
+PM_DIRECT_CHUNK = 1024
+PM_SOFTEN_CELLS = 0.5     # P3M kapalıyken r=0 yumuşatması (hücre)
+P3M_SPLIT_CELLS = 1.25    # uzun/kısa menzil ayrım ölçeği r_s (hücre)
+P3M_CUTOFF = 4.5          # kısa menzil doğrudan toplam yarıçapı (r_s cinsinden)
+P3M_PAIR_BATCH = 2_000_000
+
+def _erfc(x):
+    # Abramowitz-Stegun 7.1.26, x >= 0 için |hata| < 1.5e-7
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return poly * np.exp(-x * x)
+
+@functools.lru_cache(maxsize=8)
+def _pm_kernel_fft(grid, pad, p3m):
+    # hücre biriminde -1/r çekirdeğinin FFT'si; gerçek değer için G/h ile çarpılır
+    m = 2 * grid if pad else grid
+    k = np.arange(m)
+    k = np.minimum(k, m - k).astype(float)
+    r = np.hypot(k[:, None], k[None, :])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if p3m:
+            rs = P3M_SPLIT_CELLS
+            kern = -(1.0 - _erfc(r / (2.0 * rs))) / r
+            kern[0, 0] = -1.0 / (rs * math.sqrt(math.pi))
+        else:
+            kern = -1.0 / r
+            kern[0, 0] = -1.0 / PM_SOFTEN_CELLS
+    return np.fft.rfft2(kern)
+
+def _cic_weights(pos, origin, h, grid):
+    g = (pos - origin) / h - 0.5
+    i0 = np.clip(np.floor(g).astype(np.int64), 0, grid - 2)
+    f = np.clip(g - i0, 0.0, 1.0)
+    return i0, f
+
+def _close_pairs(pos, rcut, batch=P3M_PAIR_BATCH):
+    # rcut boyutlu hücrelerle komşu arama; her çift bir kez (yarım kabuk).
+    # Bellek sınırlı kalsın diye çiftler en fazla ~batch'lik parçalar halinde döner.
+    n = len(pos)
+    c = np.floor((pos - pos.min(axis=0)) / rcut).astype(np.int64) + 1
+    w = int(c[:, 1].max()) + 2
+    key = c[:, 0] * w + c[:, 1]
+    order = np.argsort(key, kind="stable")
+    skey = key[order]
+    for ox, oy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        nkey = key + ox * w + oy
+        lo = np.searchsorted(skey, nkey, "left")
+        cnt = np.searchsorted(skey, nkey, "right") - lo
+        ends = np.cumsum(cnt)
+        cuts = np.searchsorted(ends, np.arange(batch, int(ends[-1]), batch), "left")
+        for a, b in zip(np.r_[0, cuts], np.r_[cuts, n]):
+            part = cnt[a:b]
+            total = int(part.sum())
+            if total == 0:
+                continue
+            i = np.repeat(np.arange(a, b), part)
+            within = np.arange(total) - np.repeat(np.cumsum(part) - part, part)
+            j = order[np.repeat(lo[a:b], part) + within]
+            if ox == 0 and oy == 0:
+                keep = j > i
+                i, j = i[keep], j[keep]
+            yield i, j
+
+def _p3m_short_range(pos, mass, rs):
+    n = len(pos)
+    acc = np.zeros((n, 2))
+    rcut = P3M_CUTOFF * rs
+    for i, j in _close_pairs(pos, rcut):
+        d = pos[j] - pos[i]
+        r2 = (d * d).sum(axis=1)
+        near = (r2 > 0) & (r2 < rcut * rcut)
+        i, j, d, r2 = i[near], j[near], d[near], r2[near]
+        r = np.sqrt(r2)
+        x = r / (2.0 * rs)
+        split = _erfc(x) + (r / (rs * math.sqrt(math.pi))) * np.exp(-x * x)
+        f = (G_CONST * split / (r2 * r))[:, None] * d
+        for c in range(2):
+            acc[:, c] += np.bincount(i, weights=mass[j] * f[:, c], minlength=n)
+            acc[:, c] -= np.bincount(j, weights=mass[i] * f[:, c], minlength=n)
+    return acc
+
+def _direct_accelerations(pos, mass, sources=None, source_mass=None):
+    # doğrudan toplam, bellek için hedefler parça parça
+    if sources is None:
+        sources, source_mass = pos, mass
+    acc = np.zeros((len(pos), 2))
+    for a in range(0, len(pos), PM_DIRECT_CHUNK):
+        d = sources[None, :, :] - pos[a:a + PM_DIRECT_CHUNK, None, :]
+        r2 = (d * d).sum(axis=-1)
+        r2[r2 == 0] = np.inf
+        acc[a:a + PM_DIRECT_CHUNK] = G_CONST * (d * (source_mass[None, :] * r2 ** -1.5)[:, :, None]).sum(axis=1)
+    return acc
+
+def pm_bulk_mask(pos, grid=PM_GRID):
+    lo = np.percentile(pos, PM_BOX_PERCENTILE, axis=0)
+    hi = np.percentile(pos, 100.0 - PM_BOX_PERCENTILE, axis=0)
+    half = np.maximum((hi - lo) / 2.0 * PM_BOX_EXPAND, grid * PM_MIN_CELL / 2.0)
+    return np.all(np.abs(pos - (lo + hi) / 2.0) <= half, axis=1)
+
+def _pm_mesh_accelerations(pos, mass, grid, pad, p3m):
+    n = len(pos)
+    if n < 2:
+        return np.zeros((n, 2))
+    lo = pos.min(axis=0); hi = pos.max(axis=0)
+    extent = float((hi - lo).max())
+    # kenarda en az 2 hücre boşluk: merkezi farklar hep geçerli düğümleri okur
+    size = max(extent * (1.0 + 2.0 * PM_MARGIN), extent * grid / (grid - 4.0), grid * PM_MIN_CELL)
+    h = size / grid
+    origin = (lo + hi) / 2.0 - size / 2.0
+    m = 2 * grid if pad else grid
+
+    i0, f = _cic_weights(pos, origin, h, grid)
+    corners = []
+    for dx in (0, 1):
+        wx = f[:, 0] if dx else 1.0 - f[:, 0]
+        for dy in (0, 1):
+            wy = f[:, 1] if dy else 1.0 - f[:, 1]
+            corners.append(((i0[:, 0] + dx) * m + (i0[:, 1] + dy), wx * wy))
+
+    rho = np.zeros(m * m)
+    for idx, w in corners:
+        rho += np.bincount(idx, weights=mass * w, minlength=m * m)
+    rho = rho.reshape(m, m)
+
+    phi = np.fft.irfft2(np.fft.rfft2(rho) * _pm_kernel_fft(grid, pad, p3m), s=(m, m))
+    phi *= G_CONST / h
+    # aynı CIC ağırlıkları + simetrik çekirdek + merkezi fark: öz-kuvvet
+    # analitik olarak sıfırdır (Hockney-Eastwood)
+    gx = ((np.roll(phi, -1, axis=0) - np.roll(phi, 1, axis=0)) / (2.0 * h)).ravel()
+    gy = ((np.roll(phi, -1, axis=1) - np.roll(phi, 1, axis=1)) / (2.0 * h)).ravel()
+
+    acc = np.zeros((n, 2))
+    for idx, w in corners:
+        acc[:, 0] -= gx[idx] * w
+        acc[:, 1] -= gy[idx] * w
+
+    if p3m:
+        acc += _p3m_short_range(pos, mass, P3M_SPLIT_CELLS * h)
+    return acc
+
+def check_pm_grid(grid):
+    if grid < PM_MIN_GRID:
+        raise ValueError(f"PM ızgarası en az {PM_MIN_GRID} hücre olmalı: {grid}")
+    return int(grid)
+
+def pm_accelerations(pos, mass, grid=PM_GRID, pad=True, p3m=False):
+    grid = check_pm_grid(grid)
+    n = len(pos)
+    acc = np.zeros((n, 2))
+    if n < 2:
+        return acc
+    inside = pm_bulk_mask(pos, grid)
+    acc[inside] = _pm_mesh_accelerations(pos[inside], mass[inside], grid, pad, p3m)
+    out = ~inside
+    if not out.any():
+        return acc
+    # ızgara dışı: kendi aralarında doğrudan, ızgarayla tek kütle (monopol)
+    # olarak etkileşir; ızgaraya etkileri kütle merkezinde hesaplanıp
+    # tüm ızgara cisimlerine aynen uygulanır (gelgit terimi ihmal)
+    pos_out, mass_out = pos[out], mass[out]
+    m_in = mass[inside].sum()
+    acc_out = _direct_accelerations(pos_out, mass_out)
+    if m_in > 0:
+        cm = mass[inside] @ pos[inside] / m_in
+        acc_out += _direct_accelerations(pos_out, mass_out, cm[None, :], np.array([m_in]))
+        acc[inside] += _direct_accelerations(cm[None, :], np.array([m_in]), pos_out, mass_out)[0]
+    acc[out] = acc_out
+    return acc
+
+def make_gravity_solver(engine="direct", grid=PM_GRID, pad=True, p3m=False):
+    if engine == "pm":
+        grid = check_pm_grid(grid)
+        return functools.partial(pm_accelerations, grid=grid, pad=pad, p3m=p3m)
+    return None
+
+# -----------------------------
+# Toplu çizim (çok sayıda cisim için LOD)
+# -----------------------------
+BATCH_DRAW_MIN_BODIES = 500
+LOD_SPRITE_PX = 1.0         # gerçek (kırpılmamış) ekran yarıçapı bunu geçen cisim öncelikli çember olur
+LOD_CIRCLES_PER_MPX = 300   # zoom=1'de görünür alanın megapikseli başına çember; zoom^2 ile ölçeklenir
+LOD_MIN_CIRCLES = 16        # uzaklaşınca bile en ağır cisimler çember kalır
+LOD_MAX_CIRCLES = 2000
+BATCH_DRAW_MODE = "points"  # "points" veya "density" (üst üste binenler parlar)
+DENSITY_GAIN = 0.5
+
+def project_positions(positions, camera, zoom):
+    k = VISUAL_SCALE_BASE * zoom
+    sx = (positions[:, 0] * k).astype(np.int64) + SIDEBAR_WIDTH + int(camera[0])
+    sy = (positions[:, 1] * k).astype(np.int64) + int(camera[1])
+    return sx, sy
+
+def lod_circle_budget(zoom, view_area):
+    budget = int(LOD_CIRCLES_PER_MPX * view_area / 1e6 * zoom * zoom)
+    return max(LOD_MIN_CIRCLES, min(LOD_MAX_CIRCLES, budget))
+
+def lod_circle_mask(true_r_px, visible, budget, priority=None):
+    # görünür cisimler arasından: önce gerçekten çözülebilenler, sonra en
+    # ağırlar, sonra en büyükler bütçe kadar çember alır
+    idx = np.nonzero(visible)[0]
+    big = np.zeros(len(true_r_px), dtype=bool)
+    if len(idx) == 0:
+        return big
+    r = true_r_px[idx]
+    keys = (r,) if priority is None else (r, priority[idx])
+    order = np.lexsort(keys + (r >= LOD_SPRITE_PX,))
+    big[idx[order[-budget:]]] = True
+    return big
+
+def draw_bodies_batched(surf, positions, colors, base_px, true_px, camera, zoom, mode="points", clip=None, priority=None):
+    # küçük cisimler doğrudan piksel tamponuna yazılır; çember çizilmesi
+    # gereken cisimlerin indeksleri döndürülür
+    sx, sy = project_positions(positions, camera, zoom)
+    clip = pygame.Rect(clip) if clip is not None else surf.get_clip()
+    x0, y0, x1, y1 = clip.left, clip.top, clip.right, clip.bottom
+    m = int(max(MIN_RADIUS_PIXELS, float(base_px.max()) * zoom)) + 1 if len(base_px) else 0
+    near = (sx >= x0 - m) & (sx < x1 + m) & (sy >= y0 - m) & (sy < y1 + m)
+    budget = lod_circle_budget(zoom, clip.width * clip.height)
+    big = lod_circle_mask(true_px * zoom, near, budget, priority)
+    vis = ~big & (sx >= x0) & (sx < x1) & (sy >= y0) & (sy < y1)
+    if vis.any():
+        px = pygame.surfarray.pixels3d(surf)
+        xs, ys, cols = sx[vis], sy[vis], colors[vis]
+        if mode == "density":
+            w, h = x1 - x0, y1 - y0
+            flat = (xs - x0) * h + (ys - y0)
+            acc = np.empty((w * h, 3), dtype=np.float32)
+            for c in range(3):
+                acc[:, c] = np.bincount(flat, weights=cols[:, c], minlength=w * h)
+            acc = acc.reshape(w, h, 3) * DENSITY_GAIN
+            region = px[x0:x1, y0:y1]
+            region[...] = np.minimum(255.0, region + acc).astype(np.uint8)
+        else:
+            px[xs, ys] = cols
+        del px
+    return np.nonzero(big)[0]
+
+def draw_objects_batched(surf, objects, camera, zoom, mode="points", clip=None):
+    positions = np.array([o.position for o in objects], dtype=float)
+    colors = np.array([o.color for o in objects], dtype=np.uint8)
+    base_px = np.array([o.base_px for o in objects], dtype=float)
+    true_px = np.array([o.true_px for o in objects], dtype=float)
+    masses = np.fromiter((o.mass_kg for o in objects), dtype=float, count=len(objects))
+    big = draw_bodies_batched(surf, positions, colors, base_px, true_px, camera, zoom, mode, clip, masses)
+    is_big = np.zeros(len(objects), dtype=bool)
+    is_big[big] = True
+    for o, drawn in zip(objects, is_big):
+        if drawn:
+            o.draw(surf, camera, zoom)
+        else:
+            o.record_trail()
+
+# -----------------------------
+# Yörünge önizleme (yerleştirme sırasında)
+# -----------------------------
+PREVIEW_STEPS = 6000
+PREVIEW_STRIDE = 10         # donmuş sistem ve aday yolu her N adımda bir saklanır
+PREVIEW_CHECK_S = 0.02      # iptal kontrolü aralığı (saniye)
+PREVIEW_BUCKET_PX = 6       # imleç bu kadar piksel oynamadıkça aynı sonuç kullanılır
+PREVIEW_CACHE_SIZE = 256
+PREVIEW_REFREEZE_S = 1.0    # kayıt bu süreden (en az kayıt süresi kadar) eskiyse sistem yeniden dondurulur
+PREVIEW_COLOR_ALPHA = 0.55
+
+def central_star_state(objects):
+    for o in objects:
+        if isinstance(o, Star):
+            return (o.position.copy(), o.velocity.copy(), o.mass_kg)
+    return None
+
+def placement_velocity(pending, central, pos):
+    # central: ilk yıldızın (konum, hız, kütle) bilgisi; dairesel hız yıldızın hızına eklenir
+    vx = pending.get('vx', 0.0); vy = pending.get('vy', 0.0)
+    if pending.get('type') != 'star' and vx == 0 and vy == 0 and central is not None:
+        c_pos, c_vel, c_mass = central
+        r_vec = np.asarray(pos, dtype=float) - c_pos
+        r = math.hypot(r_vec[0], r_vec[1])
+        if r == 0:
+            return np.array(c_vel, dtype=float)
+        speed = math.sqrt(G_CONST * c_mass / r)
+        return c_vel + speed * np.array([-r_vec[1], r_vec[0]]) / r
+    return np.array([vx, vy], dtype=float)
+
+def pairwise_accelerations(pos, mass):
+    d = pos[None, :, :] - pos[:, None, :]
+    r2 = (d * d).sum(axis=-1)
+    r2[r2 == 0] = np.inf
+    return G_CONST * (d * (mass[None, :] * r2 ** -1.5)[:, :, None]).sum(axis=1)
+
+class FrozenSystem:
+    # sistemin kopyası bir kez ileri sarılır, tüm imleç kovaları bu kaydı paylaşır;
+    # iptal edilen kayıt kaldığı yerden sürer
+    def __init__(self, pos, vel, mass, dt, solver=None, steps=PREVIEW_STEPS, stride=PREVIEW_STRIDE):
+        self.mass = mass
+        self.dt = dt
+        self.stride = stride
+        self.steps = steps // stride * stride
+        self.frames = [pos.copy()]
+        self.done_at = None
+        self.record_s = 0.0
+        self._accel = solver if solver is not None else pairwise_accelerations
+        self._pos = pos.copy(); self._vel = vel.copy()
+        self._step = 0
+
+    @property
+    def complete(self):
+        return self.done_at is not None
+
+    def record(self, cancelled=None):
+        # step_physics ile aynı (yarı örtük Euler) integrasyon
+        start = time.perf_counter()
+        check_at = start + PREVIEW_CHECK_S
+        try:
+            while self._step < self.steps:
+                self._vel += self._accel(self._pos, self.mass) * self.dt
+                self._pos += self._vel * self.dt
+                self._step += 1
+                if self._step % self.stride == 0:
+                    self.frames.append(self._pos.copy())
+                now = time.perf_counter()
+                if now >= check_at:
+                    if cancelled is not None and cancelled():
+                        return False
+                    time.sleep(0)   # arayüz iş parçacığına GIL bırak
+                    check_at = time.perf_counter() + PREVIEW_CHECK_S
+        finally:
+            self.record_s += time.perf_counter() - start
+        if self.done_at is None:
+            self.done_at = time.perf_counter()
+        return True
+
+def predict_test_particle(system, pos, vel, cancelled=None):
+    # aday kütlesiz test parçacığıdır: her adım kayıtlı sisteme karşı O(N)
+    frames = system.frames; mass = system.mass; dt = system.dt; stride = system.stride
+    pos = np.array(pos, dtype=float); vel = np.array(vel, dtype=float)
+    path = [pos.copy()]
+    check_at = time.perf_counter() + PREVIEW_CHECK_S
+    for k in range(system.steps):
+        f, r = divmod(k, stride)
+        src = frames[f] if r == 0 else frames[f] + (frames[f + 1] - frames[f]) * (r / stride)
+        d = src - pos
+        r2 = (d * d).sum(axis=1)
+        r2[r2 == 0] = np.inf
+        vel += G_CONST * (d * (mass * r2 ** -1.5)[:, None]).sum(axis=0) * dt
+        pos += vel * dt
+        if (k + 1) % stride == 0:
+            path.append(pos.copy())
+        if time.perf_counter() >= check_at:
+            if cancelled is not None and cancelled():
+                return None
+            time.sleep(0)
+            check_at = time.perf_counter() + PREVIEW_CHECK_S
+    return np.array(path)
+
+def _preview_job(system, pos, vel, cancelled):
+    if not system.record(cancelled):
+        return None
+    return predict_test_particle(system, pos, vel, cancelled)
+
+class OrbitPreview:
+    def __init__(self, solver=None):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orbit-preview")
+        self._solver = solver
+        self._cache = OrderedDict()
+        self._system = None         # FrozenSystem
+        self._central = None        # donmuş ilk yıldız (konum, hız, kütle)
+        self._job = None            # (anahtar, future)
+        self._generation = 0
+        self._last = None
+
+    def reset(self):
+        self._cancel()
+        self._cache.clear()
+        self._system = None
+        self._central = None
+        self._last = None
+
+    def shutdown(self):
+        self._cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel(self):
+        self._generation += 1
+        if self._job is not None:
+            self._job[1].cancel()
+            self._job = None
+
+    def _freeze(self, objects, dt):
+        self._cancel()
+        pos = np.array([o.position for o in objects], dtype=float).reshape(-1, 2)
+        vel = np.array([o.velocity for o in objects], dtype=float).reshape(-1, 2)
+        mass = np.fromiter((o.mass_kg for o in objects), dtype=float, count=len(objects))
+        self._system = FrozenSystem(pos, vel, mass, dt, self._solver)
+        self._central = central_star_state(objects)
+        self._cache.clear()
+
+    def _stale(self, dt):
+        system = self._system
+        if system is None or system.dt != dt:
+            return True
+        if self._job is not None or not system.complete:
+            return False
+        return time.perf_counter() - system.done_at > max(PREVIEW_REFREEZE_S, system.record_s)
+
+    def path_for(self, pending, objects, world_pos, zoom, dt):
+        # hazır sonuç yoksa en son çizilen yol döner; hesap arka planda sürer
+        if self._job is not None and self._job[1].done():
+            key, fut = self._job
+            self._job = None
+            if not fut.cancelled() and fut.result() is not None:
+                self._cache[key] = fut.result()
+                while len(self._cache) > PREVIEW_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        if self._stale(dt):
+            self._freeze(objects, dt)
+        bucket = PREVIEW_BUCKET_PX / (VISUAL_SCALE_BASE * zoom)
+        bx, by = int(world_pos[0] // bucket), int(world_pos[1] // bucket)
+        key = (bx, by, round(zoom, 4))
+        path = self._cache.get(key)
+        if path is not None:
+            self._cache.move_to_end(key)
+            self._last = path
+            return path
+        if self._job is None or self._job[0] != key:
+            self._cancel()
+            start = np.array([(bx + 0.5) * bucket, (by + 0.5) * bucket])
+            gen = self._generation
+            fut = self._pool.submit(_preview_job, self._system, start,
+                                    placement_velocity(pending, self._central, start),
+                                    lambda: self._generation != gen)
+            self._job = (key, fut)
+        return self._last
+
+def draw_orbit_preview(surf, path, color, camera, zoom):
+    if path is None or len(path) < 2:
+        return
+    sx, sy = project_positions(path, camera, zoom)
+    c = tuple(int(BG_DARK[i] + (color[i] - BG_DARK[i]) * PREVIEW_COLOR_ALPHA) for i in range(3))
+    pygame.draw.lines(surf, c, False, list(zip(sx.tolist(), sy.tolist())), 1)
+
 # -----------------------------
 # Save/Load + Thumbnail (robust)
 # -----------------------------
@@ -163,35 +679,76 @@ def list_saved_simulations():
     files.sort(key=lambda x: x["mtime"], reverse=True)
     return files
 
-def save_simulation(objects, filename, fullpath=None):
-    if fullpath is None:
-        os.makedirs(APP_SAVE_DIR, exist_ok=True)
-        fullpath = os.path.join(APP_SAVE_DIR, filename + SAVE_EXT)
-    payload = []
-    for o in objects:
-        try:
-            radius_solar = (o.radius / R_sun).value
-        except Exception:
-            radius_solar = float(o.radius / R_sun)
-        payload.append({
-            "type": "star" if isinstance(o, Star) else "planet",
-            "mass_solar": float(o.mass.value / M_sun.value),
-            "radius_solar": float(radius_solar),
-            "color": list(o.color),
-            "position": [float(o.position[0]), float(o.position[1])],
-            "velocity": [float(o.velocity[0]), float(o.velocity[1])]
-        })
+def snapshot_bodies(objects):
+    # UI iş parçacığında sadece diziler toplanır; kayıt sözlükleri işçide kurulur
+    n = len(objects)
+    return {
+        "is_star": np.fromiter((isinstance(o, Star) for o in objects), dtype=bool, count=n),
+        "mass": np.fromiter((o.mass_kg for o in objects), dtype=float, count=n),
+        "radius": np.fromiter((o.radius_m for o in objects), dtype=float, count=n),
+        "color": [o.color for o in objects],
+        "position": np.array([o.position for o in objects], dtype=float).reshape(n, 2),
+        "velocity": np.array([o.velocity for o in objects], dtype=float).reshape(n, 2),
+    }
+
+def payload_from_snapshot(snap):
+    return [{
+        "type": "star" if is_star else "planet",
+        "mass_solar": m,
+        "radius_solar": r,
+        "color": list(c),
+        "position": p,
+        "velocity": v
+    } for is_star, m, r, c, p, v in zip(snap["is_star"].tolist(),
+                                         (snap["mass"] / M_sun.value).tolist(),
+                                         (snap["radius"] / R_sun.value).tolist(),
+                                         snap["color"],
+                                         snap["position"].tolist(),
+                                         snap["velocity"].tolist())]
+
+def snapshot_for_save(objects):
+    return payload_from_snapshot(snapshot_bodies(objects))
+
+def thumbnail_path(savepath):
+    base = os.path.splitext(os.path.basename(savepath))[0]
+    return os.path.join(THUMB_DIR, base + ".png")
+
+def write_save_payload(payload, fullpath):
+    # geçici dosyaya yazıp yeniden adlandır: yarım kalan kayıt eskisini bozmaz
+    tmp = fullpath + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"saved_at": time.time(), "objects": payload}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, fullpath)
+
+def write_save_snapshot(snap, fullpath, label=None):
+    return write_save(payload_from_snapshot(snap), fullpath, label)
+
+def write_save(payload, fullpath, label=None):
     try:
-        with open(fullpath, "w") as f:
-            json.dump({"saved_at": time.time(), "objects": payload}, f, indent=2)
-        try:
-            create_thumbnail_from_save(fullpath)
-        except Exception as e:
-            print("Thumbnail oluştururken hata oluştu:", e)
-        return True, fullpath
+        write_save_payload(payload, fullpath)
     except Exception as e:
         print("Kaydetme hatası:", e)
         return False, None
+    try:
+        render_thumbnail(payload, thumbnail_path(fullpath), label)
+    except Exception as e:
+        print("Thumbnail oluştururken hata oluştu:", e)
+    return True, fullpath
+
+def save_simulation(objects, filename, fullpath=None):
+    if fullpath is None:
+        os.makedirs(APP_SAVE_DIR, exist_ok=True)
+        fullpath = os.path.join(APP_SAVE_DIR, filename + SAVE_EXT)
+    return write_save(snapshot_for_save(objects), fullpath, save_label(objects, fullpath))
+
+def save_label(objects, savepath):
+    # boş kayıtta küçük resme ad yazılır; font ana iş parçacığında çizilir
+    if len(objects) > 0:
+        return None
+    font = pygame.font.SysFont("Segoe UI", 14)
+    return font.render(os.path.splitext(os.path.basename(savepath))[0], True, (220,220,220))
 
 def load_simulation_from_path(fullpath):
     if not os.path.exists(fullpath):
@@ -236,54 +793,470 @@ def load_simulation_from_path(fullpath):
 def create_thumbnail_from_save(savepath, thumb_w=320, thumb_h=240):
     try:
         objs = load_simulation_from_path(savepath)
-        surf = pygame.Surface((thumb_w, thumb_h))
-        surf.fill((10,10,16))
-        font = pygame.font.SysFont("Segoe UI", 14)
-        if not isinstance(objs, list):
-            objs = list(objs)
-        if len(objs) == 0:
-            text = os.path.splitext(os.path.basename(savepath))[0]
-            txt = font.render(text, True, (220,220,220))
-            surf.blit(txt, (10, 10))
-        else:
-            xs = [o.position[0] for o in objs]
-            ys = [o.position[1] for o in objs]
-            minx, maxx = float(min(xs)), float(max(xs))
-            miny, maxy = float(min(ys)), float(max(ys))
-            dx = max(1.0, maxx - minx)
-            dy = max(1.0, maxy - miny)
-            cx = (minx + maxx) / 2.0
-            cy = (miny + maxy) / 2.0
-            margin = 0.9
-            scale_x = (thumb_w - 40) / (dx * VISUAL_SCALE_BASE) if dx != 0 else 1.0
-            scale_y = (thumb_h - 40) / (dy * VISUAL_SCALE_BASE) if dy != 0 else 1.0
-            zoom = min(scale_x, scale_y) * margin
-            if zoom <= 0 or not math.isfinite(zoom):
-                zoom = 1.0
-            camera = [thumb_w//2 - SIDEBAR_WIDTH - int(cx * VISUAL_SCALE_BASE * zoom),
-                      thumb_h//2 - int(cy * VISUAL_SCALE_BASE * zoom)]
-            for o in objs:
-                sx = int(o.position[0] * VISUAL_SCALE_BASE * zoom) + SIDEBAR_WIDTH + int(camera[0])
-                sy = int(o.position[1] * VISUAL_SCALE_BASE * zoom) + int(camera[1])
-                try:
-                    base_px = max(1, int((o.radius.to(u.km).value) * VISUAL_SCALE_BASE / 10.0))
-                except Exception:
-                    base_px = 2
-                r_px = max(1, int(base_px * zoom))
-                if 0 <= sx < thumb_w and 0 <= sy < thumb_h:
-                    pygame.draw.circle(surf, o.color, (sx, sy), max(1, r_px))
-                else:
-                    clx = max(2, min(thumb_w-2, sx))
-                    cly = max(2, min(thumb_h-2, sy))
-                    pygame.draw.circle(surf, o.color, (clx, cly), 2)
-        base = os.path.splitext(os.path.basename(savepath))[0]
-        thumb_path = os.path.join(THUMB_DIR, base + ".png")
-        pygame.image.save(surf, thumb_path)
-        return thumb_path
+        return render_thumbnail(snapshot_for_save(objs), thumbnail_path(savepath),
+                                save_label(objs, savepath), thumb_w, thumb_h)
     except Exception as ex:
         print("Thumbnail hatası:", repr(ex))
         return None
 
+def render_thumbnail(payload, thumb_path, label=None, thumb_w=320, thumb_h=240):
+    surf = pygame.Surface((thumb_w, thumb_h))
+    surf.fill((10,10,16))
+    if len(payload) == 0:
+        if label is not None:
+            surf.blit(label, (10, 10))
+    else:
+        xs = [e["position"][0] for e in payload]
+        ys = [e["position"][1] for e in payload]
+        minx, maxx = float(min(xs)), float(max(xs))
+        miny, maxy = float(min(ys)), float(max(ys))
+        dx = max(1.0, maxx - minx)
+        dy = max(1.0, maxy - miny)
+        cx = (minx + maxx) / 2.0
+        cy = (miny + maxy) / 2.0
+        margin = 0.9
+        scale_x = (thumb_w - 40) / (dx * VISUAL_SCALE_BASE) if dx != 0 else 1.0
+        scale_y = (thumb_h - 40) / (dy * VISUAL_SCALE_BASE) if dy != 0 else 1.0
+        zoom = min(scale_x, scale_y) * margin
+        if zoom <= 0 or not math.isfinite(zoom):
+            zoom = 1.0
+        camera = [thumb_w//2 - SIDEBAR_WIDTH - int(cx * VISUAL_SCALE_BASE * zoom),
+                  thumb_h//2 - int(cy * VISUAL_SCALE_BASE * zoom)]
+        for e in payload:
+            sx, sy = world_to_screen(e["position"], camera, zoom)
+            # yüklenen gezegenlerin yarıçapı Planet içinde 100 ile çarpılır
+            scale = 1 if e["type"] == "star" else 100
+            base_px = max(1, int(e["radius_solar"] * scale * R_SUN_KM * VISUAL_SCALE_BASE / 10.0))
+            r_px = max(1, int(base_px * zoom))
+            color = tuple(e["color"])
+            if 0 <= sx < thumb_w and 0 <= sy < thumb_h:
+                pygame.draw.circle(surf, color, (sx, sy), max(1, r_px))
+            else:
+                clx = max(2, min(thumb_w-2, sx))
+                cly = max(2, min(thumb_h-2, sy))
+                pygame.draw.circle(surf, color, (clx, cly), 2)
+    tmp = thumb_path[:-4] + ".tmp.png"
+    pygame.image.save(surf, tmp)
+    os.replace(tmp, thumb_path)
+    return thumb_path
+
+# -----------------------------
+# Arka plan kaydı + otomatik kayıt
+# -----------------------------
+AUTOSAVE_NAME = "autosave"
+AUTOSAVE_KEEP = 3
+
+def rotate_autosaves(keep=AUTOSAVE_KEEP):
+    # autosave -> autosave_1 -> ... -> autosave_<keep>, en eskisi silinir
+    names = [AUTOSAVE_NAME] + [f"{AUTOSAVE_NAME}_{i}" for i in range(1, keep + 1)]
+    for older, newer in reversed(list(zip(names, names[1:]))):
+        for src, dst in ((os.path.join(APP_SAVE_DIR, older + SAVE_EXT), os.path.join(APP_SAVE_DIR, newer + SAVE_EXT)),
+                         (os.path.join(THUMB_DIR, older + ".png"), os.path.join(THUMB_DIR, newer + ".png"))):
+            if os.path.exists(src):
+                os.replace(src, dst)
+
+def write_autosave(snap, keep=AUTOSAVE_KEEP, label=None):
+    try:
+        if keep > 0:
+            rotate_autosaves(keep)
+    except Exception as e:
+        print("Otomatik kayıt döndürme hatası:", e)
+    return write_save_snapshot(snap, os.path.join(APP_SAVE_DIR, AUTOSAVE_NAME + SAVE_EXT), label)
+
+class SavePipeline:
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+        self._jobs = []             # (tür, ad, future)
+
+    def save(self, objects, name):
+        os.makedirs(APP_SAVE_DIR, exist_ok=True)
+        fullpath = os.path.join(APP_SAVE_DIR, name + SAVE_EXT)
+        fut = self._pool.submit(write_save_snapshot, snapshot_bodies(objects), fullpath, save_label(objects, fullpath))
+        self._jobs.append(("save", name, fut))
+
+    def autosave(self, objects, keep=AUTOSAVE_KEEP):
+        # önceki otomatik kayıt bitmeden yenisi kuyruğa girmez
+        if any(kind == "autosave" and not fut.done() for kind, _, fut in self._jobs):
+            return False
+        os.makedirs(APP_SAVE_DIR, exist_ok=True)
+        label = save_label(objects, AUTOSAVE_NAME)
+        fut = self._pool.submit(write_autosave, snapshot_bodies(objects), keep, label)
+        self._jobs.append(("autosave", AUTOSAVE_NAME, fut))
+        return True
+
+    def poll(self):
+        finished = [j for j in self._jobs if j[2].done()]
+        self._jobs = [j for j in self._jobs if j not in finished]
+        results = []
+        for kind, name, fut in finished:
+            try:
+                ok, path = fut.result()
+            except Exception as e:
+                print("Kaydetme hatası:", e)
+                ok, path = False, None
+            results.append((kind, name, ok, path))
+        return results
+
+    def shutdown(self):
+        # bekleyen kayıtlar yarıda kalmasın
+        self._pool.shutdown(wait=True)
+
+def resolve_save_path(name_or_path):
+    if os.path.isfile(name_or_path):
+        return name_or_path
+    name = os.path.splitext(os.path.basename(name_or_path))[0]
+    return os.path.join(APP_SAVE_DIR, name + SAVE_EXT)
+
+def library_save_path(name):
+    # dışarıdan gelen adlar için: sadece kayıt klasöründeki dosyalar, yol kabul edilmez
+    name = name.strip()
+    if name.lower().endswith(SAVE_EXT):
+        name = name[:-len(SAVE_EXT)]
+    if not name or name in (".", "..") or "/" in name or "\\" in name:
+        return None
+    path = os.path.join(APP_SAVE_DIR, name + SAVE_EXT)
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(APP_SAVE_DIR):
+        return None
+    return path
+
+# -----------------------------
+# Offline render (headless)
+# -----------------------------
+RENDER_DIR = os.path.join(DOCUMENTS, "OrbitalSimulator", "Renders")
+RENDER_TRAIL_LEN = 300
+
+def record_state_buffer(objects, frames, dt, substeps=1, solver=None):
+    # fizik önce tamamen koşturulur; render süreçleri sadece bu tamponu okur
+    buf = np.empty((frames, len(objects), 2), dtype=float)
+    for f in range(frames):
+        buf[f] = [o.position for o in objects]
+        for _ in range(substeps):
+            step_physics(objects, dt / substeps, solver)
+    return buf
+
+def fit_view(points, size, margin=0.9):
+    w, h = size
+    minx, miny = points.min(axis=0)
+    maxx, maxy = points.max(axis=0)
+    dx = max(1.0, maxx - minx)
+    dy = max(1.0, maxy - miny)
+    zoom = min((w - 40) / (dx * VISUAL_SCALE_BASE), (h - 40) / (dy * VISUAL_SCALE_BASE)) * margin
+    if zoom <= 0 or not math.isfinite(zoom):
+        zoom = 1.0
+    return zoom
+
+def view_centered_on(center, size, zoom):
+    w, h = size
+    cx, cy = center
+    camera = [w//2 - SIDEBAR_WIDTH - int(cx * VISUAL_SCALE_BASE * zoom),
+              h//2 - int(cy * VISUAL_SCALE_BASE * zoom)]
+    return camera, zoom
+
+def camera_path(buffer, size, mode="fit", zoom=None, masses=None):
+    pts = buffer.reshape(-1, 2)
+    if mode == "com":
+        if masses is None:
+            masses = np.ones(buffer.shape[1])
+        centers = buffer.transpose(0, 2, 1) @ (masses / masses.sum())
+        if zoom is None:
+            reach = np.abs(buffer - centers[:, None, :]).reshape(-1, 2).max(axis=0)
+            zoom = fit_view(np.array([-reach, reach]), size)
+        return [view_centered_on(c, size, zoom) for c in centers]
+    if zoom is None:
+        zoom = fit_view(pts, size)
+    center = (pts.min(axis=0) + pts.max(axis=0)) / 2.0
+    return [view_centered_on(center, size, zoom)] * len(buffer)
+
+def render_state_frame(buffer, index, colors, base_px, view, size, trail_len=RENDER_TRAIL_LEN, masses=None, true_px=None):
+    camera, zoom = view
+    surf = pygame.Surface(size)
+    surf.fill(BG_DARK)
+    start = max(0, index - trail_len)
+    bodies = range(buffer.shape[1])
+    if buffer.shape[1] >= BATCH_DRAW_MIN_BODIES:
+        if true_px is None:
+            true_px = np.zeros(len(base_px))
+        bodies = draw_bodies_batched(surf, buffer[index], colors, base_px, true_px, camera, zoom, priority=masses)
+    for k in bodies:
+        color = tuple(colors[k])
+        if index - start > 0:
+            pts = [world_to_screen(p, camera, zoom) for p in buffer[start:index+1, k]]
+            pygame.draw.lines(surf, color, False, pts, max(1, int(1*zoom)))
+        sx, sy = world_to_screen(buffer[index, k], camera, zoom)
+        pygame.draw.circle(surf, color, (sx, sy), max(MIN_RADIUS_PIXELS, int(base_px[k] * zoom)))
+    return surf
+
+_render_ctx = None
+
+def _render_worker_init(ctx):
+    global _render_ctx
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    _render_ctx = ctx
+
+def _render_frame_job(index):
+    ctx = _render_ctx
+    surf = render_state_frame(ctx["buffer"], index, ctx["colors"], ctx["base_px"],
+                              ctx["views"][index], ctx["size"], ctx["trail_len"], ctx["masses"], ctx["true_px"])
+    path = os.path.join(ctx["out_dir"], f"frame_{index:05d}.png")
+    pygame.image.save(surf, path)
+    return path
+
+def render_offline(savepath, out_dir=None, frames=600, size=(1280, 720), speed=1.0, substeps=1,
+                   camera_mode="fit", zoom=None, workers=None, trail_len=RENDER_TRAIL_LEN, solver=None):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if frames < 1 or substeps < 1:
+        print("Kare ve alt adım sayısı en az 1 olmalı")
+        return []
+    objects = load_simulation_from_path(savepath)
+    if len(objects) == 0:
+        print("Render edilecek cisim yok:", savepath)
+        return []
+    if out_dir is None:
+        out_dir = os.path.join(RENDER_DIR, os.path.splitext(os.path.basename(savepath))[0])
+    os.makedirs(out_dir, exist_ok=True)
+    masses = np.fromiter((o.mass_kg for o in objects), dtype=float, count=len(objects))
+    ctx = {
+        "colors": np.array([o.color for o in objects], dtype=np.uint8),
+        "base_px": np.array([o.base_px for o in objects], dtype=float),
+        "true_px": np.array([o.true_px for o in objects], dtype=float),
+        "buffer": record_state_buffer(objects, frames, DT_BASE * speed, substeps, solver),
+        "masses": masses,
+        "size": tuple(size),
+        "trail_len": trail_len,
+        "out_dir": out_dir,
+    }
+    ctx["views"] = camera_path(ctx["buffer"], ctx["size"], camera_mode, zoom, masses)
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, frames // (workers * 4))
+    # "with Pool" terminate() ile çıkar; pygame.init() yapılmış bir süreçten
+    # çatallanan işçiler terminate'te takılabildiği için düzgün kapatılır
+    pool = multiprocessing.Pool(workers, initializer=_render_worker_init, initargs=(ctx,))
+    try:
+        paths = pool.map(_render_frame_job, range(frames), chunksize=chunk)
+    finally:
+        pool.close()
+        pool.join()
+    print(f"{len(paths)} kare yazıldı:", out_dir)
+    return paths
+
+# -----------------------------
+# Durum yayını (asyncio, yerel soket)
+# -----------------------------
+# Çerçeve: başlık + gövde. Anahtar karede gövde ids (uint64[n]) ve state
+# (float64[n,5]: x, y, vx, vy, kütle) olarak ham yazılır. Delta karede cisim
+# kümesi aynıdır; gövde state'in önceki gönderilen kareyle bit düzeyinde
+# XOR'unun zlib ile sıkıştırılmış halidir.
+STREAM_MAGIC = b"CSMS"
+STREAM_VERSION = 1
+STREAM_KEYFRAME = 0
+STREAM_DELTA = 1
+STREAM_RATE = 20.0
+STREAM_KEYFRAME_EVERY = 60
+STREAM_MAX_BUFFER = 4 * 1024 * 1024   # istemci bunun üstünde geride kalırsa kare atlanır
+_STREAM_HEADER = struct.Struct("<4sBBHIdII")  # magic, sürüm, tür, boş, seq, sim zamanı, n, gövde boyu
+
+def snapshot_state(objects):
+    n = len(objects)
+    ids = np.fromiter((o.uid for o in objects), dtype=np.uint64, count=n)
+    state = np.empty((n, 5), dtype=np.float64)
+    for i, o in enumerate(objects):
+        state[i, 0:2] = o.position
+        state[i, 2:4] = o.velocity
+        state[i, 4] = o.mass_kg
+    return ids, state
+
+def _byte_view(arr):
+    # boş dizilerde memoryview.cast çalışmaz
+    return memoryview(arr).cast("B") if arr.size else b""
+
+def encode_state_frame(seq, sim_time, ids, state, prev=None):
+    # prev: aynı istemciye en son gönderilen (ids, state)
+    if prev is not None and np.array_equal(prev[0], ids):
+        delta = state.view(np.uint64) ^ prev[1].view(np.uint64)
+        body = [zlib.compress(_byte_view(delta), 1)]
+        kind = STREAM_DELTA
+    else:
+        body = [_byte_view(ids), _byte_view(state)]
+        kind = STREAM_KEYFRAME
+    size = sum(len(b) for b in body)
+    header = _STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, kind, 0, seq, sim_time, len(ids), size)
+    return [header] + body
+
+def decode_state_frame(header, body, prev=None):
+    magic, version, kind, _, seq, sim_time, n, size = _STREAM_HEADER.unpack(header)
+    if magic != STREAM_MAGIC or version != STREAM_VERSION:
+        raise ValueError("tanınmayan akış çerçevesi")
+    if kind == STREAM_KEYFRAME:
+        ids = np.frombuffer(body, dtype=np.uint64, count=n)
+        state = np.frombuffer(body, dtype=np.float64, offset=8 * n).reshape(n, 5)
+    else:
+        if prev is None:
+            raise ValueError("delta kare için önceki kare gerekli")
+        ids = prev[0]
+        delta = np.frombuffer(zlib.decompress(body), dtype=np.uint64).reshape(n, 5)
+        state = (delta ^ prev[1].view(np.uint64)).view(np.float64)
+    return seq, sim_time, ids, state
+
+def parse_stream_command(line):
+    parts = line.strip().split(None, 1)
+    if not parts:
+        return None
+    cmd = parts[0].lower()
+    arg = parts[1] if len(parts) > 1 else None
+    if cmd in ("pause", "resume"):
+        return (cmd, None)
+    if cmd == "speed" and arg is not None:
+        try:
+            return (cmd, float(arg))
+        except ValueError:
+            return None
+    if cmd == "load" and arg:
+        return (cmd, arg.strip())
+    return None
+
+def check_stream_address(address):
+    # yayın sadece yerel: unix soketi veya loopback adresi
+    if address.startswith("unix:"):
+        if not address[5:]:
+            raise ValueError("unix soket yolu boş")
+        return address
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"adres host:port biçiminde olmalı: {address!r}")
+    host = host.strip("[]") or "127.0.0.1"
+    if host != "localhost":
+        try:
+            loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"yayın sadece yerel adreslere açılabilir (127.0.0.1, ::1, localhost): {host!r}")
+    return f"{host}:{port}"
+
+class StateStreamServer:
+    def __init__(self, address, rate=STREAM_RATE):
+        self.address = check_stream_address(address)
+        if not (math.isfinite(rate) and rate > 0):
+            raise ValueError(f"yayın hızı pozitif olmalı: {rate!r}")
+        self.rate = float(rate)
+        self.commands = queue.Queue()
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self._clients = {}   # writer -> uyandırma olayı
+        self._latest = None
+        self._seq = 0
+        self._next_publish = 0.0
+        self._thread = threading.Thread(target=self._run, name="state-stream", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(5.0)
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(2.0)
+
+    def publish(self, objects, sim_time):
+        now = time.perf_counter()
+        if self._loop is None or not self._clients or now < self._next_publish:
+            return
+        self._next_publish = now + 1.0 / self.rate
+        ids, state = snapshot_state(objects)
+        self._seq += 1
+        self._loop.call_soon_threadsafe(self._broadcast, (self._seq, sim_time, ids, state))
+
+    def poll_commands(self):
+        while True:
+            try:
+                yield self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except Exception as ex:
+            print("Yayın sunucusu hatası:", ex)
+        finally:
+            self._ready.set()
+            self._loop.close()
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        if self.address.startswith("unix:"):
+            server = await asyncio.start_unix_server(self._handle, path=self.address[5:])
+        else:
+            host, _, port = self.address.rpartition(":")
+            server = await asyncio.start_server(self._handle, host or "127.0.0.1", int(port))
+        print("Durum yayını:", self.address)
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+        for writer in list(self._clients):
+            writer.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _broadcast(self, snap):
+        # her istemcide sadece en son kare bekler; yavaş olan aradakileri kaçırır
+        self._latest = snap
+        for wake in self._clients.values():
+            wake.set()
+
+    async def _handle(self, reader, writer):
+        wake = asyncio.Event()
+        self._clients[writer] = wake
+        commands = asyncio.ensure_future(self._read_commands(reader, wake))
+        prev = None
+        sent = 0
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                if commands.done() or writer.is_closing():
+                    break
+                if writer.transport.get_write_buffer_size() > STREAM_MAX_BUFFER:
+                    continue
+                seq, sim_time, ids, state = self._latest
+                key = prev if sent % STREAM_KEYFRAME_EVERY else None
+                try:
+                    frame = encode_state_frame(seq, sim_time, ids, state, key)
+                except Exception as ex:
+                    # bozuk tek kare bağlantıyı düşürmesin; sonraki anahtar kare olur
+                    print("Yayın karesi atlandı:", ex)
+                    prev = None
+                    sent = 0
+                    continue
+                writer.writelines(frame)
+                prev = (ids, state)
+                sent += 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            commands.cancel()
+            writer.close()
+
+    async def _read_commands(self, reader, wake):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                cmd = parse_stream_command(line.decode("utf-8", "replace"))
+                if cmd is not None:
+                    self.commands.put(cmd)
+        except ConnectionError:
+            return
+        finally:
+            wake.set()
+
 # -----------------------------
 # UI yardımcıları
 # -----------------------------
@@ -312,7 +1285,7 @@ def draw_slider(surf, rect, knob_x, font, speed_multiplier):
 # -----------------------------
 # Main uygulama
 # -----------------------------
-def main():
+def main(serve=None, serve_rate=STREAM_RATE, autosave=0, autosave_keep=AUTOSAVE_KEEP, solver=None):
     pygame.init()
     pygame.display.set_caption("Cosmos Simulator")
     screen = pygame.display.set_mode((1200, 750), pygame.RESIZABLE)
@@ -340,10 +1313,11 @@ def main():
     dialog_type = None
     waiting_for_place = False
     pending_object_data = None
+    orbit_preview = OrbitPreview(solver)
 
     dragging_knob = False
     speed_multiplier = 1.0
-    dt_base = 60*60
+    dt_base = DT_BASE
 
     camera = [0.0, 0.0]
     dragging_camera = False
@@ -379,6 +1353,16 @@ def main():
     load_thumbs_cache()
 
     app_state = "menu"  # kesinlikle menü ile başlasın
+    paused = False
+    sim_time = 0.0
+
+    saver = SavePipeline()
+    next_autosave = time.time() + autosave
+
+    stream = None
+    if serve:
+        stream = StateStreamServer(serve, serve_rate)
+        stream.start()
 
     running = True
     while running:
@@ -403,6 +1387,7 @@ def main():
                     if create_btn.collidepoint((mx,my)):
                         objects = []
                         camera = [0.0,0.0]; zoom = 1.0; follow_target=None; follow_pending=False
+                        sim_time = 0.0
                         app_state = "sim"
                     else:
                         # compute card rects
@@ -418,6 +1403,7 @@ def main():
                                 if load_btn.collidepoint((mx,my)):
                                     objects = load_simulation_from_path(s["path"]) if isinstance(s, dict) else []
                                     camera = [0.0,0.0]; zoom = 1.0; follow_target=None; follow_pending=False
+                                    sim_time = 0.0
                                     app_state = "sim"
                                     break
                                 # Delete
@@ -541,6 +1527,7 @@ def main():
                                 camera[:] = [0.0, 0.0]
                                 zoom = 1.0
                                 follow_target = None; follow_pending = False
+                                sim_time = 0.0
                             elif btn_follow.collidepoint((mx,my)):
                                 follow_pending = not follow_pending
                                 if follow_pending:
@@ -565,12 +1552,11 @@ def main():
                                         objects.append(Star(mass, radius, color, position=(wx, wy), velocity=(vx,vy)))
                                     else:
                                         p = Planet(mass, radius, color, position=(wx, wy), velocity=(vx,vy))
-                                        if vx==0 and vy==0 and any(isinstance(o, Star) for o in objects):
-                                            central = [o for o in objects if isinstance(o, Star)][0]
-                                            p.velocity = circular_velocity_vector(central, p.position)
+                                        p.velocity = placement_velocity(pending_object_data, central_star_state(objects), p.position)
                                         objects.append(p)
                                 waiting_for_place = False
                                 pending_object_data = None
+                                orbit_preview.reset()
 
                 if event.type == pygame.MOUSEBUTTONUP:
                     if event.button in (2,3):
@@ -612,6 +1598,7 @@ def main():
                                 vx_val = vy_val = 0.0
                         pending_object_data = {'type': dialog_type, 'mass': mass_val, 'radius': radius_val, 'color': color_val, 'vx': vx_val, 'vy': vy_val}
                         waiting_for_place = True
+                        orbit_preview.reset()
                         dialog_window.kill(); dialog_window = None
                         submit_btn = None; mass_input = radius_input = color_input = vx_input = vy_input = None; dialog_type = None
                     # Save confirm
@@ -622,23 +1609,11 @@ def main():
                         if name == "":
                             name = f"sim_{int(time.time())}"
                         safe_name = "".join(c for c in name if c.isalnum() or c in (" ", "_","-")).rstrip()
-                        ok, path = save_simulation(objects, safe_name)
-                        if ok:
-                            try:
-                                parent_window.kill()
-                            except:
-                                pass
-                            saved_list[:] = list_saved_simulations()
-                            load_thumbs_cache()
-                            pygame_gui.windows.UIMessageWindow(rect=pygame.Rect((SCREEN_WIDTH//2-160, SCREEN_HEIGHT//2-80),(320,120)),
-                                                               manager=manager,
-                                                               window_title="Kaydedildi",
-                                                               html_message=f"Kaydedildi: <b>{safe_name}</b>")
-                        else:
-                            pygame_gui.windows.UIMessageWindow(rect=pygame.Rect((SCREEN_WIDTH//2-160, SCREEN_HEIGHT//2-80),(320,120)),
-                                                               manager=manager,
-                                                               window_title="Kaydetme Başarısız",
-                                                               html_message="Kaydedilemedi. Klasör izinlerini kontrol edin.")
+                        saver.save(objects, safe_name)
+                        try:
+                            parent_window.kill()
+                        except:
+                            pass
                 if event.type == pygame_gui.UI_COLOUR_PICKER_COLOUR_PICKED:
                     col = event.colour
                     if dialog_window is not None and color_input is not None:
@@ -672,25 +1647,60 @@ def main():
                                                                html_message="Dosya silinemedi.")
                 # If cancelled, nothing to do (UI handles closing)
 
+        # dış istemci komutları
+        if stream is not None:
+            for cmd, arg in stream.poll_commands():
+                if cmd == "pause":
+                    paused = True
+                elif cmd == "resume":
+                    paused = False
+                elif cmd == "speed":
+                    speed_multiplier = max(0.1, min(5.0, arg))
+                    knob_x = slider_rect.x + int((speed_multiplier - 0.1) / 4.9 * slider_rect.width)
+                elif cmd == "load":
+                    path = library_save_path(arg)
+                    if path is not None and os.path.exists(path):
+                        objects = load_simulation_from_path(path)
+                        camera = [0.0,0.0]; zoom = 1.0; follow_target=None; follow_pending=False
+                        sim_time = 0.0
+                        app_state = "sim"
+                    else:
+                        print("Yayın komutu: kayıt bulunamadı:", arg)
+
+        # arka plan kayıtları
+        if autosave and app_state == "sim" and objects and time.time() >= next_autosave:
+            if saver.autosave(objects, autosave_keep):
+                next_autosave = time.time() + autosave
+        for kind, name, ok, path in saver.poll():
+            if kind == "autosave":
+                if not ok:
+                    print("Otomatik kayıt başarısız")
+                continue
+            if ok:
+                saved_list[:] = list_saved_simulations()
+                try:
+                    thumbs_cache[name] = pygame.image.load(thumbnail_path(path)).convert_alpha()
+                except Exception:
+                    thumbs_cache[name] = None
+                pygame_gui.windows.UIMessageWindow(rect=pygame.Rect((SCREEN_WIDTH//2-160, SCREEN_HEIGHT//2-80),(320,120)),
+                                                   manager=manager,
+                                                   window_title="Kaydedildi",
+                                                   html_message=f"Kaydedildi: <b>{name}</b>")
+            else:
+                pygame_gui.windows.UIMessageWindow(rect=pygame.Rect((SCREEN_WIDTH//2-160, SCREEN_HEIGHT//2-80),(320,120)),
+                                                   manager=manager,
+                                                   window_title="Kaydetme Başarısız",
+                                                   html_message="Kaydedilemedi. Klasör izinlerini kontrol edin.")
+
         # manager update
         manager.update(time_delta)
 
         # physics
-        n = len(objects)
-        for o in objects:
-            o.acceleration[:] = 0.0
-        for i in range(n):
-            for j in range(i+1, n):
-                a = objects[i]; b = objects[j]
-                r_vec = b.position - a.position
-                dist = np.linalg.norm(r_vec)
-                if dist == 0: continue
-                f = G_CONST * a.mass.value * b.mass.value / (dist*dist)
-                dir_uv = r_vec / dist
-                a.acceleration += (f / a.mass.value) * dir_uv
-                b.acceleration -= (f / b.mass.value) * dir_uv
-        for o in objects:
-            o.move(dt_base * speed_multiplier)
+        if not paused:
+            step_physics(objects, dt_base * speed_multiplier, solver)
+            sim_time += dt_base * speed_multiplier
+        if stream is not None and app_state == "sim":
+            stream.publish(objects, sim_time)
 
         if follow_target is not None:
             tx, ty = world_to_screen(follow_target.position, camera, zoom)
@@ -749,27 +1759,111 @@ def main():
             draw_button_rect(screen, btn_follow, "Takip Et (Seç)" if follow_pending else ("Takip Ediliyor" if follow_target else "Takip Et (Seç)"), font)
             slider_rect.y = SCREEN_HEIGHT - 110
             draw_slider(screen, slider_rect, knob_x, small_font, speed_multiplier)
-            pygame.draw.rect(screen, BG_DARK, (SIDEBAR_WIDTH, 0, SCREEN_WIDTH - SIDEBAR_WIDTH, SCREEN_HEIGHT))
-            for o in objects:
+            viewport_rect = pygame.Rect(SIDEBAR_WIDTH, 0, SCREEN_WIDTH - SIDEBAR_WIDTH, SCREEN_HEIGHT)
+            pygame.draw.rect(screen, BG_DARK, viewport_rect)
+            if len(objects) >= BATCH_DRAW_MIN_BODIES:
                 try:
-                    o.draw(screen, camera, zoom)
+                    draw_objects_batched(screen, objects, camera, zoom, BATCH_DRAW_MODE, viewport_rect)
                 except Exception as ex:
-                    print("draw object hatası:", ex)
+                    print("toplu çizim hatası:", ex)
+            else:
+                for o in objects:
+                    try:
+                        o.draw(screen, camera, zoom)
+                    except Exception as ex:
+                        print("draw object hatası:", ex)
             if waiting_for_place and pending_object_data is not None:
                 help_txt = small_font.render("Yerleştirmek için ekrana tıkla", True, TEXT_LIGHT)
                 screen.blit(help_txt, (SIDEBAR_WIDTH + 12, SCREEN_HEIGHT - 36))
                 mx, my = pygame.mouse.get_pos()
                 if mx > SIDEBAR_WIDTH:
+                    try:
+                        path = orbit_preview.path_for(pending_object_data, objects, screen_to_world((mx,my), camera, zoom),
+                                                      zoom, dt_base * speed_multiplier)
+                        draw_orbit_preview(screen, path, pending_object_data['color'], camera, zoom)
+                    except Exception as ex:
+                        print("yörünge önizleme hatası:", ex)
                     try:
                         r_px = max(MIN_RADIUS_PIXELS, int(pending_object_data['radius'] * R_sun.to(u.km).value * VISUAL_SCALE_BASE * zoom / 10.0))
                     except Exception:
                         r_px = 4
                     pygame.draw.circle(screen, pending_object_data['color'], (mx, my), r_px, 2)
+            if paused:
+                screen.blit(small_font.render("Duraklatıldı", True, TEXT_MUTED), (SIDEBAR_WIDTH + 12, 12))
             manager.draw_ui(screen)
             pygame.display.flip()
 
+    orbit_preview.shutdown()
+    saver.shutdown()
+    if stream is not None:
+        stream.stop()
     pygame.quit()
     sys.exit()
 
+def parse_size(text):
+    try:
+        w, h = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"geçersiz boyut: {text!r} (ör. 1920x1080)")
+    if w < 1 or h < 1:
+        raise argparse.ArgumentTypeError(f"boyut pozitif olmalı: {text!r}")
+    return (w, h)
+
+def stream_address(text):
+    try:
+        return check_stream_address(text)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(str(ex))
+
+def pm_grid_size(text):
+    try:
+        grid = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"geçersiz ızgara boyu: {text!r}")
+    try:
+        return check_pm_grid(grid)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(str(ex))
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"en az 1 olmalı: {text}")
+    return value
+
+def positive_float(text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"geçersiz sayı: {text!r}")
+    if not (math.isfinite(value) and value > 0):
+        raise argparse.ArgumentTypeError(f"pozitif olmalı: {text}")
+    return value
+
 if __name__ == "__main__":
-    main()
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Cosmos Simulator")
+    parser.add_argument("--render", metavar="KAYIT", help="kaydı pencere açmadan PNG kare dizisi olarak render et (ad veya yol)")
+    parser.add_argument("--out", help="kare klasörü (varsayılan: Documents/OrbitalSimulator/Renders/<ad>)")
+    parser.add_argument("--frames", type=positive_int, default=600)
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="GxY, ör. 1920x1080")
+    parser.add_argument("--speed", type=float, default=1.0, help="simülasyon hızı çarpanı")
+    parser.add_argument("--substeps", type=positive_int, default=1, help="kare başına fizik adımı")
+    parser.add_argument("--camera", choices=("fit", "com"), default="fit", help="fit: sabit, com: kütle merkezini takip")
+    parser.add_argument("--zoom", type=float, default=None)
+    parser.add_argument("--workers", type=positive_int, default=None)
+    parser.add_argument("--serve", metavar="ADRES", type=stream_address, help="durumu yerel sokette yayınla: 127.0.0.1:port veya unix:/yol")
+    parser.add_argument("--serve-rate", type=positive_float, default=STREAM_RATE, help="saniyedeki yayın karesi")
+    parser.add_argument("--autosave", type=float, default=0, metavar="SANİYE", help="bu aralıkla arka planda otomatik kaydet (0: kapalı)")
+    parser.add_argument("--autosave-keep", type=int, default=AUTOSAVE_KEEP, help="saklanacak eski otomatik kayıt sayısı")
+    parser.add_argument("--gravity", choices=("direct", "pm"), default="direct", help="direct: çift çift toplam, pm: FFT parçacık-ağ")
+    parser.add_argument("--pm-grid", type=pm_grid_size, default=PM_GRID, help="PM ızgara boyu (hücre)")
+    parser.add_argument("--pm-periodic", action="store_true", help="sıfır dolgusu yerine periyodik sınır")
+    parser.add_argument("--p3m", action="store_true", help="yakın çiftler için kısa menzil doğrudan düzeltme")
+    args = parser.parse_args()
+    solver = make_gravity_solver(args.gravity, args.pm_grid, not args.pm_periodic, args.p3m)
+    if args.render:
+        render_offline(resolve_save_path(args.render), args.out, args.frames, args.size, args.speed,
+                       args.substeps, args.camera, args.zoom, args.workers, solver=solver)
+    else:
+        main(args.serve, args.serve_rate, args.autosave, args.autosave_keep, solver)